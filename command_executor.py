@@ -1,23 +1,67 @@
 """
 Command execution handler for the OpenAI Assistant Project with real-time output.
 """
+import asyncio
+import io
 import os
 import re
-import subprocess
+import shutil
 import tempfile
 import time
 import shlex
 import sys
-from threading import Thread
-from queue import Queue, Empty
 
-def read_output(pipe, queue):
-    """Read output from a pipe and put it in a queue."""
-    for line in iter(pipe.readline, b''):
-        queue.put(line.decode('utf-8'))
-    pipe.close()
+# Flush stdout on every newline so command output appears in real time without explicit flushes
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(line_buffering=True)
 
-def execute_command_realtime(command, prefix=""):
+# Characters that need /bin/sh to interpret (pipes, redirection, expansion, globbing, escapes)
+SHELL_METACHARACTERS = re.compile(r'[|&;<>()$`\\*?\[\]{}~#!\n]')
+
+# Potentially dangerous commands that are plain substrings, checked against the lowercased command
+DANGEROUS_LITERALS = [
+    'mkfs',              # Format filesystems
+    ':{:', ':&};:',      # Fork bomb (the two branches matched by the old ':(){:|:&};:' regex)
+]
+
+# Potentially dangerous command patterns, keyed by a literal that every match contains
+DANGEROUS_PATTERNS = {
+    'rm': r'rm\s+-rf\s+[/~]',  # Remove root or home
+    'dd': r'dd\s+if=/dev/zero', # Disk destroyer
+    'chmod': r'chmod\s+-R\s+777\s+[/~]', # Recursive permission change
+    'wget': r'wget.+\s+\|\s+bash', # Download and execute
+    'curl': r'curl.+\s+\|\s+bash', # Download and execute
+}
+
+# Compiled once; a regex only runs when its literal occurs in the command
+DANGEROUS_RES = [(literal, re.compile(pattern, re.IGNORECASE)) for literal, pattern in DANGEROUS_PATTERNS.items()]
+
+def direct_argv(command):
+    """
+    Split a command into an argument list if it can run without a shell.
+    
+    Args:
+        command (str): The command to check
+        
+    Returns:
+        list: The argument list, or None if the command needs /bin/sh
+    """
+    if SHELL_METACHARACTERS.search(command):
+        return None
+    
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        # Unbalanced quotes; let the shell report the error
+        return None
+    
+    # Variable assignments, builtins, and unknown programs are left to the shell
+    if not argv or '=' in argv[0] or shutil.which(argv[0]) is None:
+        return None
+    
+    return argv
+
+async def execute_command_realtime(command, prefix=""):
     """
     Execute a single command with real-time output display.
     
@@ -28,68 +72,79 @@ def execute_command_realtime(command, prefix=""):
     Returns:
         tuple: (exit_code, full_output)
     """
+    full_output = io.BytesIO()
+    exit_code = await _run_command(command, prefix, full_output)
+    return exit_code, full_output.getvalue().decode('utf-8', errors='replace')
+
+async def _run_command(command, prefix, output):
+    """
+    Execute a single command, displaying its output and appending it to a buffer.
+    
+    Args:
+        command (str): Command to execute
+        prefix (str): Prefix to display before each line of output
+        output (io.BytesIO): Buffer that receives the raw command output
+        
+    Returns:
+        int: The exit code
+    """
     # Print the command being executed
     print(f"\n{prefix}$ {command}")
-    sys.stdout.flush()
-    
-    # Start the command process
-    process = subprocess.Popen(
-        command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        bufsize=1,
-        universal_newlines=False
-    )
     
-    # Set up queues for stdout and stderr
-    stdout_queue = Queue()
-    stderr_queue = Queue()
-    
-    # Set up threads to read stdout and stderr
-    stdout_thread = Thread(target=read_output, args=(process.stdout, stdout_queue))
-    stderr_thread = Thread(target=read_output, args=(process.stderr, stderr_queue))
-    
-    # Start threads
-    stdout_thread.daemon = True
-    stderr_thread.daemon = True
-    stdout_thread.start()
-    stderr_thread.start()
-    
-    # Collect full output for return
-    full_output = []
-    
-    # Read and display output in real-time
-    while True:
-        # Check if process has finished
-        if process.poll() is not None and stdout_queue.empty() and stderr_queue.empty():
-            break
-        
-        # Read from stdout queue
-        try:
-            stdout_line = stdout_queue.get_nowait()
-            print(f"{prefix}> {stdout_line}", end='')
-            sys.stdout.flush()
-            full_output.append(stdout_line)
-        except Empty:
-            pass
-        
-        # Read from stderr queue
+    # Start the command process, skipping /bin/sh when it has nothing to interpret
+    argv = direct_argv(command)
+    process = None
+    if argv:
         try:
-            stderr_line = stderr_queue.get_nowait()
-            print(f"{prefix}! {stderr_line}", end='')
-            sys.stdout.flush()
-            full_output.append(f"ERROR: {stderr_line}")
-        except Empty:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except OSError:
+            # exec can refuse files the shell still runs (scripts without a shebang,
+            # noexec mounts); fall back so skipping the shell never changes the result
             pass
+    if process is None:
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    
+    def emit(is_stderr, line):
+        marker = '!' if is_stderr else '>'
+        print(f"{prefix}{marker} {line.decode('utf-8', errors='replace')}", end='')
+        if is_stderr:
+            output.write(b"ERROR: ")
+        output.write(line)
+    
+    async def pump(stream, is_stderr):
+        # Read in chunks rather than readline() so long lines cannot overrun the stream limit
+        pending = bytearray()
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            pending += chunk
+            end = pending.rfind(b'\n') + 1
+            if end:
+                for line in pending[:end].splitlines(keepends=True):
+                    emit(is_stderr, line)
+                del pending[:end]
         
-        time.sleep(0.1)
+        # Flush any unterminated last line
+        if pending:
+            emit(is_stderr, bytes(pending))
     
-    # Join threads to ensure they are complete
-    stdout_thread.join()
-    stderr_thread.join()
+    # Read and display output in real-time
+    await asyncio.gather(
+        pump(process.stdout, False),
+        pump(process.stderr, True),
+        process.wait()
+    )
     
-    return process.returncode, ''.join(full_output)
+    return process.returncode
 
 def execute_commands(commands, timeout=300):
     """
@@ -100,38 +155,54 @@ def execute_commands(commands, timeout=300):
         timeout (int, optional): Command execution timeout in seconds
         
     Returns:
-        str: Command output or error message
+        tuple: (output, exit_code) where exit_code is that of the last command run
+    """
+    return asyncio.run(execute_commands_async(commands, timeout))
+
+async def execute_commands_async(commands, timeout=300):
+    """
+    Execute a series of shell commands with real-time output from a running event loop.
+    
+    Args:
+        commands (str): Commands to execute, separated by newlines
+        timeout (int, optional): Command execution timeout in seconds
+        
+    Returns:
+        tuple: (output, exit_code) where exit_code is that of the last command run
     """
     if not commands.strip():
-        return "No commands to execute."
+        return "No commands to execute.", 0
     
     # Split commands into individual lines
     command_lines = [cmd for cmd in commands.split('\n') if cmd.strip() and not cmd.strip().startswith('#')]
     
     print("\n=== Starting Command Execution ===")
-    output_parts = []
-    start_time = time.time()
+    # Section headers and raw command output share one buffer, decoded once at the end
+    output = io.BytesIO()
+    exit_code = 0
+    start_time = time.monotonic()
+    deadline = start_time + timeout
     
     for i, cmd in enumerate(command_lines):
         # Check for timeout
-        if time.time() - start_time > timeout:
-            output_parts.append(f"\nERROR: Command execution timed out after {timeout} seconds.")
+        if time.monotonic() > deadline:
+            output.write(f"\nERROR: Command execution timed out after {timeout} seconds.\n".encode())
+            exit_code = 1
             break
         
         command_prefix = f"[{i+1}/{len(command_lines)}]"
-        exit_code, cmd_output = execute_command_realtime(cmd, prefix=command_prefix)
-        
-        output_parts.append(f"\n# Command {i+1}: {cmd}")
-        output_parts.append(cmd_output)
+        output.write(f"\n# Command {i+1}: {cmd}\n".encode())
+        exit_code = await _run_command(cmd, command_prefix, output)
+        output.write(b"\n")
         
         if exit_code != 0:
-            output_parts.append(f"\nERROR: Command failed with exit code {exit_code}")
+            output.write(f"\nERROR: Command failed with exit code {exit_code}\n".encode())
             break
     
-    execution_time = time.time() - start_time
-    output_parts.append(f"\n=== Execution completed in {execution_time:.2f} seconds ===")
+    execution_time = time.monotonic() - start_time
+    output.write(f"\n=== Execution completed in {execution_time:.2f} seconds ===".encode())
     
-    return '\n'.join(output_parts)
+    return output.getvalue().decode('utf-8', errors='replace'), exit_code
 
 def is_safe_command(command):
     """
@@ -143,23 +214,13 @@ def is_safe_command(command):
     Returns:
         bool: True if command is safe, False otherwise
     """
-    # List of potentially dangerous command patterns
-    dangerous_patterns = [
-        r'rm\s+-rf\s+[/~]',  # Remove root or home
-        r'mkfs',             # Format filesystems
-        r'dd\s+if=/dev/zero', # Disk destroyer
-        r':(){:|:&};:',      # Fork bomb
-        r'chmod\s+-R\s+777\s+[/~]', # Recursive permission change
-        r'wget.+\s+\|\s+bash', # Download and execute
-        r'curl.+\s+\|\s+bash', # Download and execute
-    ]
-    
-    # Check each dangerous pattern
-    for pattern in dangerous_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return False
-    
-    return True
+    lowered = command.lower()
+    
+    # Fixed-string scans first, then only the regexes whose literal is present
+    if any(literal in lowered for literal in DANGEROUS_LITERALS):
+        return False
+    
+    return not any(literal in lowered and regex.search(command) for literal, regex in DANGEROUS_RES)
 
 def filter_commands(commands):
     """
@@ -177,7 +238,8 @@ def filter_commands(commands):
     
     for i, line in enumerate(lines):
         # Skip empty lines or comments
-        if not line.strip() or line.strip().startswith('#'):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
             filtered_lines.append(line)
             continue
         
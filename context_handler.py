@@ -5,31 +5,137 @@ import os
 import json
 import datetime
 import sqlite3
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
+from typing import List, Dict, Any, Optional, Union
 import time
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Pragmas applied to every pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
+# Seconds a get_sessions_list result may be reused before the table is read again
+SESSIONS_CACHE_TTL = 2.0
+
+# Conservative bound on parameters per statement (SQLITE_MAX_VARIABLE_NUMBER)
+MAX_SQL_VARIABLES = 900
+
+# Message content and command output at least this large is stored zstd-compressed
+COMPRESS_MIN_BYTES = 1024
+
+# Frame header that marks a compressed value
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+def _pack(text: str) -> Union[str, bytes]:
+    """
+    Compress large text for storage; small text, or text when zstandard is missing, is kept as-is.
+    
+    Args:
+        text (str): The text to store
+        
+    Returns:
+        Union[str, bytes]: The original text or a zstd frame
+    """
+    if zstandard is None or text is None or len(text) < COMPRESS_MIN_BYTES:
+        return text
+    
+    data = text.encode("utf-8")
+    packed = zstandard.ZstdCompressor(level=3).compress(data)
+    return packed if len(packed) < len(data) else text
+
+def _unpack(value: Union[str, bytes, None]) -> Optional[str]:
+    """
+    Reverse _pack when reading a column back.
+    
+    Args:
+        value (Union[str, bytes, None]): The stored value
+        
+    Returns:
+        str: The original text
+    """
+    if not isinstance(value, bytes):
+        return value
+    
+    if value.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("This database contains compressed data; install the zstandard package to read it.")
+        value = zstandard.ZstdDecompressor().decompress(value)
+    
+    return value.decode("utf-8")
+
 class ConversationContext:
     """
     Manages the context for conversations with the OpenAI API.
     Uses SQLite to store context data for better persistence and retrieval.
     """
-    def __init__(self, db_path: str = "data/conversation_context.db"):
+    def __init__(self, db_path: str = "data/conversation_context.db", pool_size: int = 5):
         """
         Initialize the context handler.
         
         Args:
             db_path (str): Path to the SQLite database
+            pool_size (int, optional): Maximum number of idle connections kept open
         """
         self.db_path = db_path
         
         # Ensure database directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
+        # Connections are opened lazily and reused across calls
+        self._pool = Queue(maxsize=pool_size)
+        
+        # (monotonic time fetched, sessions) from the last get_sessions_list call
+        self._sessions_cache = None
+        
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new configured SQLite connection."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection from the pool, returning it when done."""
+        try:
+            conn = self._pool.get_nowait()
+        except Empty:
+            conn = self._connect()
+        
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except Full:
+                conn.close()
+    
+    def close(self):
+        """Close all idle pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                break
+    
     def _init_db(self):
         """Initialize the SQLite database."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
             
             # Create sessions table
@@ -50,10 +156,10 @@ class ConversationContext:
                 message_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_id TEXT,
                 call_number INTEGER,
-                timestamp TEXT,
+                timestamp REAL,
                 role TEXT,
                 content TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE
             )
             ''')
             
@@ -67,9 +173,9 @@ class ConversationContext:
                 output TEXT,
                 exit_code INTEGER,
                 execution_time REAL,
-                timestamp TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (session_id),
-                FOREIGN KEY (message_id) REFERENCES messages (message_id)
+                timestamp REAL,
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE,
+                FOREIGN KEY (message_id) REFERENCES messages (message_id) ON DELETE CASCADE
             )
             ''')
             
@@ -82,13 +188,51 @@ class ConversationContext:
                 command_id INTEGER,
                 key TEXT,
                 value TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (session_id),
-                FOREIGN KEY (message_id) REFERENCES messages (message_id),
-                FOREIGN KEY (command_id) REFERENCES commands (command_id)
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE,
+                FOREIGN KEY (message_id) REFERENCES messages (message_id) ON DELETE CASCADE,
+                FOREIGN KEY (command_id) REFERENCES commands (command_id) ON DELETE CASCADE
             )
             ''')
             
-            conn.commit()
+            # Create indexes for the per-session and per-message lookups
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, call_number DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_commands_msg ON commands (message_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tags_msg ON tags (message_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tags_cmd ON tags (command_id)")
+            
+            # Indexes on the remaining foreign keys keep cascading deletes from scanning
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_commands_session ON commands (session_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tags_session ON tags (session_id)")
+            
+            # Tables created before ON DELETE CASCADE was declared still need explicit deletes
+            self._cascade_deletes = all(
+                row["on_delete"] == "CASCADE"
+                for table in ("messages", "commands", "tags")
+                for row in cursor.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+            )
+            
+            # Tables created before timestamps became REAL keep getting ISO text, so each
+            # table only ever holds one timestamp format
+            self._text_timestamps = {
+                table for table in ("messages", "commands")
+                if any(row["name"] == "timestamp" and row["type"].upper() == "TEXT"
+                       for row in cursor.execute(f"PRAGMA table_info({table})").fetchall())
+            }
+    
+    def _timestamp(self, table: str, now: float) -> Union[float, str]:
+        """
+        Convert a Unix time to the format stored in a table's timestamp column.
+        
+        Args:
+            table (str): Table being written
+            now (float): Unix time
+            
+        Returns:
+            Union[float, str]: Unix time for REAL columns, ISO text for legacy TEXT columns
+        """
+        if table in self._text_timestamps:
+            return datetime.datetime.fromtimestamp(now).isoformat()
+        return now
     
     def create_session(self, system_info: str, base_prompt: str, name: Optional[str] = None) -> str:
         """
@@ -105,14 +249,14 @@ class ConversationContext:
         session_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         current_time = datetime.datetime.now().isoformat()
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
                 (session_id, name or f"Session {session_id}", current_time, current_time, system_info, base_prompt)
             )
-            conn.commit()
         
+        self._sessions_cache = None
         return session_id
     
     def add_message(self, session_id: str, role: str, content: str, call_number: int) -> int:
@@ -128,27 +272,51 @@ class ConversationContext:
         Returns:
             int: The message ID
         """
-        current_time = datetime.datetime.now().isoformat()
+        return self.add_messages([(session_id, role, content, call_number)])[0]
+    
+    def add_messages(self, rows: List[tuple]) -> List[int]:
+        """
+        Add several messages to the conversation in a single transaction.
+        
+        Args:
+            rows (List[tuple]): (session_id, role, content, call_number) tuples
+            
+        Returns:
+            List[int]: The message IDs, in the same order as rows
+        """
+        if not rows:
+            return []
         
-        with sqlite3.connect(self.db_path) as conn:
+        # Message timestamps are stored as Unix time (ISO text in legacy tables); the session
+        # keeps ISO text for display
+        now = time.time()
+        timestamp = self._timestamp("messages", now)
+        last_updated = datetime.datetime.fromtimestamp(now).isoformat()
+        
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
             
+            # Hold the write lock so the new row IDs are contiguous
+            cursor.execute("BEGIN IMMEDIATE")
+            
             # Update session last_updated time
-            cursor.execute(
+            cursor.executemany(
                 "UPDATE sessions SET last_updated = ? WHERE session_id = ?",
-                (current_time, session_id)
+                [(last_updated, session_id) for session_id in dict.fromkeys(row[0] for row in rows)]
             )
             
-            # Insert message
-            cursor.execute(
+            # Insert messages
+            cursor.executemany(
                 "INSERT INTO messages (session_id, call_number, timestamp, role, content) VALUES (?, ?, ?, ?, ?)",
-                (session_id, call_number, current_time, role, content)
+                [(session_id, call_number, timestamp, role, _pack(content))
+                 for session_id, role, content, call_number in rows]
             )
             
-            message_id = cursor.lastrowid
-            conn.commit()
+            last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
         
-        return message_id
+        # last_updated changed for these sessions
+        self._sessions_cache = None
+        return list(range(last_id - len(rows) + 1, last_id + 1))
     
     def add_command(self, session_id: str, message_id: int, command_text: str, 
                    output: str, exit_code: int, execution_time: float) -> int:
@@ -166,20 +334,40 @@ class ConversationContext:
         Returns:
             int: The command ID
         """
-        current_time = datetime.datetime.now().isoformat()
+        return self.add_commands([(session_id, message_id, command_text, output, exit_code, execution_time)])[0]
+    
+    def add_commands(self, rows: List[tuple]) -> List[int]:
+        """
+        Add several command execution records in a single transaction.
+        
+        Args:
+            rows (List[tuple]): (session_id, message_id, command_text, output,
+                exit_code, execution_time) tuples
+            
+        Returns:
+            List[int]: The command IDs, in the same order as rows
+        """
+        if not rows:
+            return []
         
-        with sqlite3.connect(self.db_path) as conn:
+        timestamp = self._timestamp("commands", time.time())
+        
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
-            cursor.execute(
+            
+            # Hold the write lock so the new row IDs are contiguous
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            cursor.executemany(
                 "INSERT INTO commands (session_id, message_id, command_text, output, exit_code, execution_time, timestamp) "
                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (session_id, message_id, command_text, output, exit_code, execution_time, current_time)
+                [(session_id, message_id, command_text, _pack(output), exit_code, execution_time, timestamp)
+                 for session_id, message_id, command_text, output, exit_code, execution_time in rows]
             )
             
-            command_id = cursor.lastrowid
-            conn.commit()
+            last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
         
-        return command_id
+        return list(range(last_id - len(rows) + 1, last_id + 1))
     
     def add_tag(self, session_id: str, key: str, value: str, message_id: Optional[int] = None, 
                command_id: Optional[int] = None) -> int:
@@ -196,7 +384,7 @@ class ConversationContext:
         Returns:
             int: The tag ID
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO tags (session_id, message_id, command_id, key, value) VALUES (?, ?, ?, ?, ?)",
@@ -204,7 +392,6 @@ class ConversationContext:
             )
             
             tag_id = cursor.lastrowid
-            conn.commit()
         
         return tag_id
     
@@ -221,11 +408,10 @@ class ConversationContext:
         Returns:
             List[Dict[str, Any]]: List of message dictionaries
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
             
-            query = "SELECT * FROM messages WHERE session_id = ? ORDER BY call_number DESC"
+            query = "SELECT * FROM messages WHERE session_id = ? ORDER BY call_number DESC, message_id DESC"
             params = [session_id]
             
             if limit is not None:
@@ -233,32 +419,47 @@ class ConversationContext:
                 params.extend([limit, offset])
             
             cursor.execute(query, params)
-            results = cursor.fetchall()
+            messages = [dict(row, content=_unpack(row["content"]), commands=[], tags={}) for row in cursor.fetchall()]
+            by_id = {message["message_id"]: message for message in messages}
+            ids = list(by_id)
             
-            messages = []
-            for row in results:
-                message = dict(row)
+            # Fetch commands and tags for all messages at once, chunked to stay
+            # under SQLite's bound-parameter limit
+            for start in range(0, len(ids), MAX_SQL_VARIABLES):
+                chunk = ids[start:start + MAX_SQL_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
                 
-                # Get commands for this message
                 cursor.execute(
-                    "SELECT * FROM commands WHERE message_id = ?",
-                    (message["message_id"],)
+                    f"SELECT * FROM commands WHERE message_id IN ({placeholders}) ORDER BY command_id",
+                    chunk
                 )
-                commands = [dict(cmd) for cmd in cursor.fetchall()]
-                message["commands"] = commands
+                for row in cursor.fetchall():
+                    by_id[row["message_id"]]["commands"].append(dict(row, output=_unpack(row["output"])))
                 
-                # Get tags for this message
                 cursor.execute(
-                    "SELECT key, value FROM tags WHERE message_id = ?",
-                    (message["message_id"],)
+                    f"SELECT message_id, key, value FROM tags WHERE message_id IN ({placeholders}) ORDER BY tag_id",
+                    chunk
                 )
-                tags = {row["key"]: row["value"] for row in cursor.fetchall()}
-                message["tags"] = tags
-                
-                messages.append(message)
+                for row in cursor.fetchall():
+                    by_id[row["message_id"]]["tags"][row["key"]] = row["value"]
         
         return messages
     
+    def get_message_count(self, session_id: str) -> int:
+        """
+        Count the messages stored for a session.
+        
+        Args:
+            session_id (str): The session ID
+            
+        Returns:
+            int: Number of messages in the session
+        """
+        with self._connection() as conn, conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,))
+            return cursor.fetchone()[0]
+    
     def get_conversation_history(self, session_id: str, limit: Optional[int] = None) -> str:
         """
         Get formatted conversation history for a session.
@@ -270,53 +471,71 @@ class ConversationContext:
         Returns:
             str: Formatted conversation history
         """
-        messages = self.get_session_messages(session_id, limit)
+        return self._format_history(self.get_session_messages(session_id, limit))
+    
+    def _format_history(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Format already-fetched session messages as conversation history.
         
-        # Organize by call number
-        call_data = {}
-        for message in messages:
-            call_number = message["call_number"]
-            if call_number not in call_data:
-                call_data[call_number] = {
-                    "user": None,
-                    "assistant": None,
-                    "commands": []
-                }
+        Args:
+            messages (List[Dict[str, Any]]): Messages as returned by get_session_messages (newest first)
             
-            if message["role"] == "user":
-                call_data[call_number]["user"] = message
-            elif message["role"] == "assistant":
-                call_data[call_number]["assistant"] = message
-                
-            # Add commands
-            for cmd in message.get("commands", []):
-                call_data[call_number]["commands"].append(cmd)
-        
-        # Format as string
+        Returns:
+            str: Formatted conversation history
+        """
         history_parts = []
-        for call_number, data in sorted(call_data.items()):
-            history_parts.append(f"## CALL #{call_number}")
-            
-            if data["user"]:
-                history_parts.append("### Prompt Given:")
-                history_parts.append(data["user"]["content"])
-            
-            if data["assistant"]:
-                history_parts.append("### Assistant Response:")
-                history_parts.append(data["assistant"]["content"])
-            
-            if data["commands"]:
+        commands = []
+        current_call = None
+        
+        def close_call():
+            if commands:
                 history_parts.append("### Commands Executed:")
-                for cmd in data["commands"]:
+                for cmd in commands:
                     history_parts.append(f"Command: {cmd['command_text']}")
                     history_parts.append(f"Output: {cmd['output']}")
                     history_parts.append(f"Exit Code: {cmd['exit_code']}")
                     history_parts.append(f"Execution Time: {cmd['execution_time']:.2f}s")
-            
             history_parts.append("---")
         
+        # Messages arrive newest first, so walking them in reverse yields each call
+        # in order with its prompt ahead of its response
+        for message in reversed(messages):
+            if message["call_number"] != current_call:
+                if current_call is not None:
+                    close_call()
+                current_call = message["call_number"]
+                commands = []
+                history_parts.append(f"## CALL #{current_call}")
+            
+            if message["role"] == "user":
+                history_parts.append("### Prompt Given:")
+                history_parts.append(message["content"])
+            elif message["role"] == "assistant":
+                history_parts.append("### Assistant Response:")
+                history_parts.append(message["content"])
+            
+            commands.extend(message.get("commands", []))
+        
+        if current_call is not None:
+            close_call()
+        
         return "\n".join(history_parts)
     
+    def session_exists(self, session_id: str) -> bool:
+        """
+        Check whether a session exists.
+        
+        Args:
+            session_id (str): The session ID
+            
+        Returns:
+            bool: True if the session exists, False otherwise
+        """
+        with self._connection() as conn, conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM sessions WHERE session_id = ? LIMIT 1", (session_id,))
+            return cursor.fetchone() is not None
+    
     def get_sessions_list(self) -> List[Dict[str, Any]]:
         """
         Get a list of all sessions.
@@ -324,11 +543,17 @@ class ConversationContext:
         Returns:
             List[Dict[str, Any]]: List of session dictionaries
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        cached = self._sessions_cache
+        if cached and time.monotonic() - cached[0] < SESSIONS_CACHE_TTL:
+            return list(cached[1])
+        
+        with self._connection() as conn, conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM sessions ORDER BY start_time DESC")
-            return [dict(row) for row in cursor.fetchall()]
+            sessions = [dict(row) for row in cursor.fetchall()]
+        
+        self._sessions_cache = (time.monotonic(), sessions)
+        return list(sessions)
     
     def delete_session(self, session_id: str) -> bool:
         """
@@ -341,9 +566,14 @@ class ConversationContext:
             bool: True if successful, False otherwise
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn, conn:
                 cursor = conn.cursor()
                 
+                if self._cascade_deletes:
+                    # Messages, commands, and tags are removed by the foreign key cascades
+                    cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                    return True
+                
                 # Delete tags
                 cursor.execute("DELETE FROM tags WHERE session_id = ?", (session_id,))
                 
@@ -356,11 +586,12 @@ class ConversationContext:
                 # Delete session
                 cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
                 
-                conn.commit()
                 return True
         except Exception as e:
             print(f"Error deleting session: {str(e)}")
             return False
+        finally:
+            self._sessions_cache = None
     
     def get_openai_context(self, session_id: str, limit: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -373,31 +604,67 @@ class ConversationContext:
         Returns:
             Dict[str, Any]: OpenAI API context
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Get session info
-            cursor.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
-            session = dict(cursor.fetchone())
-            
-            # Get messages
-            messages = self.get_session_messages(session_id, limit)
-            
-            # Format for OpenAI
-            openai_messages = [
-                {"role": "system", "content": f"# === SYSTEM INFORMATION ===\n{session['system_info']}\n# === BASE USER PROMPT ===\nPrompt: {session['base_prompt']}\n# === CONVERSATION HISTORY ===\n{self.get_conversation_history(session_id, limit)}"}
-            ]
-            
-            # Add messages in chronological order (older first)
-            for message in reversed(messages):
-                if message["role"] in ["user", "assistant"]:
-                    openai_messages.append({
-                        "role": message["role"],
-                        "content": message["content"]
-                    })
+        # Get session info
+        session = self.get_session(session_id)
+        
+        # Get messages
+        messages = self.get_session_messages(session_id, limit)
         
         return {
             "session": session,
-            "messages": openai_messages
+            "messages": self.build_openai_messages(session, messages)
         }
+    
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        """
+        Get the stored row for a session.
+        
+        Args:
+            session_id (str): The session ID
+            
+        Returns:
+            Dict[str, Any]: Session dictionary
+        """
+        with self._connection() as conn, conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
+            return dict(cursor.fetchone())
+    
+    def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a session's metadata and message count without loading its messages.
+        
+        Args:
+            session_id (str): The session ID
+            
+        Returns:
+            Optional[Dict[str, Any]]: Dictionary with session_id, name, start_time,
+            last_updated, and message_count, or None if the session does not exist
+        """
+        with self._connection() as conn, conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT s.session_id, s.name, s.start_time, s.last_updated,
+                   (SELECT COUNT(*) FROM messages m WHERE m.session_id = s.session_id) AS message_count
+            FROM sessions s
+            WHERE s.session_id = ?
+            ''', (session_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def build_openai_messages(self, session: Dict[str, Any], messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Build OpenAI API messages from a session and already-fetched messages.
+        
+        Args:
+            session (Dict[str, Any]): Session dictionary as returned by get_session
+            messages (List[Dict[str, Any]]): Messages in get_session_messages format (newest first)
+            
+        Returns:
+            List[Dict[str, str]]: Messages for the OpenAI API
+        """
+        # The rendered history already carries every prompt, response, and command
+        # result, so the past turns are not repeated as separate messages.
+        return [
+            {"role": "system", "content": f"# === SYSTEM INFORMATION ===\n{session['system_info']}\n# === BASE USER PROMPT ===\nPrompt: {session['base_prompt']}\n# === CONVERSATION HISTORY ===\n{self._format_history(messages)}"}
+        ]
@@ -7,17 +7,62 @@ executes commands in real-time, and maintains context between API calls.
 """
 import os
 import sys
-import re
 import argparse
+import asyncio
+import collections
+import functools
+import platform
+import shutil
 import time
 from typing import List, Dict, Any, Optional
 import json
+import queue
+import threading
 import uuid
-import readline  # Enables command history and editing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from context_handler import ConversationContext
 from command_executor import execute_commands, filter_commands
-from openai_handler import make_openai_request
+from openai_handler import make_openai_request, make_openai_request_async, submit_batch
+
+# Tags that delimit executable commands in assistant responses
+CMD_OPEN = "<command>"
+CMD_CLOSE = "</command>"
+CMD_PLACEHOLDER = "<command>...</command>"
+
+# Terminal color sequences, built once rather than on every call
+C_RESET = "\033[0m"
+C_DIM = "\033[0;37m"
+C_PROMPT = "\n\033[1;36m> \033[0m"
+C_CALL = "\n\033[1;32m=== CALL #"
+C_SUCCESS = "\n\033[1;32m"
+C_ASSIST = "\n\033[1;34mAssistant:\033[0m\n"
+C_EXEC = "\n\033[1;33mExecuting Commands:\033[0m\n"
+C_UNSAFE = "\n\033[1;31mWARNING: Skipped potentially unsafe commands:\033[0m\n"
+C_COMPLETE = "\n\033[1;32mSession complete.\033[0m\n"
+
+def _json_dumps(obj):
+    """Serialize obj as indented JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+# Context writes whose result isn't needed right away, applied in order by a background thread
+_write_q = queue.Queue()
+
+def _temperature(value):
+    """Parse a --temperature value, rejecting anything the API would refuse."""
+    try:
+        temperature = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid float value: '{value}'")
+    if not 0.0 <= temperature <= 2.0:
+        raise argparse.ArgumentTypeError(f"must be between 0.0 and 2.0, got {value}")
+    return temperature
 
 def get_args():
     """Parse command-line arguments."""
@@ -46,6 +91,15 @@ def get_args():
                         help='Automatically loop using the same prompt')
     parser.add_argument('--loop-delay', '-d', type=int, default=2,
                         help='Delay between loops in seconds (for auto-loop mode)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Number of API calls to keep in flight in non-interactive auto-loop mode; above 1 '
+                             'the calls are independent: each gets the starting context, none sees the others\' '
+                             'responses or command output, and --loop-delay is ignored')
+    parser.add_argument('--rpm', type=float, default=0,
+                        help='Maximum API calls per minute for concurrent auto-loop mode (0 for no limit)')
+    parser.add_argument('--batch', action='store_true',
+                        help='Submit non-interactive calls as one OpenAI Batch API job of independent requests '
+                             'that do not see each other\'s results (can take up to 24h)')
     
     # Context controls
     parser.add_argument('--history-limit', type=int, default=10,
@@ -58,8 +112,8 @@ def get_args():
                         help='Override the default system information')
     parser.add_argument('--export-session', '-e', type=str,
                         help='Export a session to a JSON file')
-    parser.add_argument('--temperature', '-t', type=float, default=0.7,
-                        help='Temperature for OpenAI API (0.0-1.0)')
+    parser.add_argument('--temperature', '-t', type=_temperature, default=0.7,
+                        help='Temperature for OpenAI API (0.0-2.0)')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Enable verbose output')
     
@@ -114,9 +168,16 @@ def list_sessions(context):
         print(f"{session['session_id']:<20} {session['name']:<30} {session['start_time'][:16]:<20} {session['last_updated'][:16]:<20}")
     print("-" * 80)
 
+def _format_size(num_bytes):
+    """Format a byte count the way `df -h` and `free -h` do."""
+    for unit in ("B", "K", "M", "G", "T"):
+        if num_bytes < 1024 or unit == "T":
+            return f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+
+@functools.lru_cache(maxsize=1)
 def get_system_info():
-    """Get detailed system information."""
-    import platform
+    """Get detailed system information (computed once per process)."""
     import subprocess
     
     try:
@@ -126,34 +187,51 @@ def get_system_info():
         # Add more detailed info for Linux
         if platform.system() == "Linux":
             try:
+                # Only PRETTY_NAME is needed, so stop reading once it is found
+                os_name = ""
                 with open("/etc/os-release", "r") as f:
-                    os_info = dict(line.strip().split('=', 1) for line in f if '=' in line)
-                    os_name = os_info.get('PRETTY_NAME', '').strip('"')
-                    system_info = f"System: {platform.node()}, {os_name}, {platform.machine()}"
+                    for line in f:
+                        if line.startswith("PRETTY_NAME="):
+                            os_name = line[len("PRETTY_NAME="):].strip().strip('"\'')
+                            break
+                system_info = f"System: {platform.node()}, {os_name}, {platform.machine()}"
                 
                 # Get CPU info
-                cpu_info = subprocess.check_output("cat /proc/cpuinfo | grep 'model name' | uniq", shell=True).decode('utf-8').strip()
-                if cpu_info:
-                    processor = cpu_info.split(':')[1].strip()
-                    system_info += f"\nProcessor: {processor}"
+                with open("/proc/cpuinfo", "r") as f:
+                    for line in f:
+                        if line.startswith("model name"):
+                            processor = line.split(':', 1)[1].strip()
+                            system_info += f"\nProcessor: {processor}"
+                            break
                 
-                # Get memory info
-                mem_info = subprocess.check_output("free -h | grep Mem", shell=True).decode('utf-8').strip()
-                if mem_info:
-                    system_info += f"\nMemory: {mem_info}"
+                # Get memory info (values in /proc/meminfo are in kB)
+                with open("/proc/meminfo", "r") as f:
+                    mem_info = {}
+                    for line in f:
+                        key, _, value = line.partition(':')
+                        mem_info[key] = int(value.split()[0]) * 1024
+                if 'MemTotal' in mem_info:
+                    mem_total = mem_info['MemTotal']
+                    mem_available = mem_info.get('MemAvailable', mem_info.get('MemFree', 0))
+                    system_info += (f"\nMemory: {_format_size(mem_total)} total, "
+                                    f"{_format_size(mem_total - mem_available)} used, "
+                                    f"{_format_size(mem_available)} available")
                 
                 # Get disk info
-                disk_info = subprocess.check_output("df -h / | grep /", shell=True).decode('utf-8').strip()
-                if disk_info:
-                    system_info += f"\nDisk: {disk_info}"
+                disk = shutil.disk_usage("/")
+                system_info += (f"\nDisk: {_format_size(disk.total)} total, {_format_size(disk.used)} used, "
+                                f"{_format_size(disk.free)} free")
                 
-                # Get WSL info if applicable
-                try:
-                    wsl_info = subprocess.check_output("wsl.exe --status", shell=True, stderr=subprocess.STDOUT).decode('utf-8').strip()
-                    if wsl_info:
-                        system_info += f"\nWSL: {wsl_info}"
-                except:
-                    pass
+                # Get WSL info if applicable; skip the probe entirely when wsl.exe isn't on PATH
+                wsl_exe = shutil.which("wsl.exe")
+                if wsl_exe:
+                    try:
+                        wsl_info = subprocess.run([wsl_exe, "--status"], stdout=subprocess.PIPE,
+                                                  stderr=subprocess.STDOUT, check=True).stdout.decode('utf-8').strip()
+                        if wsl_info:
+                            system_info += f"\nWSL: {wsl_info}"
+                    except:
+                        pass
             except:
                 pass
         
@@ -166,18 +244,137 @@ def get_system_info():
 
 def extract_commands(response_text):
     """Extract commands from the OpenAI response."""
-    command_start_tag = "<command>"
-    command_end_tag = "</command>"
+    # Plain substring search; the first complete block wins, as with the old lazy regex
+    start = response_text.find(CMD_OPEN)
+    if start < 0:
+        return ""
     
-    pattern = f"{command_start_tag}(.*?){command_end_tag}"
-    match = re.search(pattern, response_text, re.DOTALL)
+    start += len(CMD_OPEN)
+    end = response_text.find(CMD_CLOSE, start)
+    if end < 0:
+        return ""
     
-    if match:
-        return match.group(1).strip()
-    return ""
+    return response_text[start:end].strip()
+
+class CommandRedactor:
+    """
+    Write streamed response text, replacing each <command>...</command> block with a placeholder.
+    
+    Text that might be the start of an opening tag is held back until the next
+    chunk arrives, so tags split across chunks are still recognised.
+    """
+    def __init__(self, write):
+        """
+        Initialize the redactor.
+        
+        Args:
+            write (Callable[[str], None]): Function that receives the redacted text
+        """
+        self._write = write
+        self._buffer = ""
+        self._in_command = False
+        self._wrote = False
+        self.fed = False
+    
+    def _emit(self, text):
+        if text:
+            self._write(text)
+            self._wrote = True
+    
+    def feed(self, text):
+        """Process the next chunk of response text."""
+        self.fed = True
+        self._buffer += text
+        
+        while True:
+            tag = CMD_CLOSE if self._in_command else CMD_OPEN
+            index = self._buffer.find(tag)
+            if index < 0:
+                break
+            
+            self._emit(CMD_PLACEHOLDER if self._in_command else self._buffer[:index])
+            self._buffer = self._buffer[index + len(tag):]
+            self._in_command = not self._in_command
+        
+        # Command bodies stay buffered until their closing tag arrives
+        if self._in_command:
+            return
+        
+        keep = 0
+        for length in range(min(len(self._buffer), len(CMD_OPEN) - 1), 0, -1):
+            if self._buffer.endswith(CMD_OPEN[:length]):
+                keep = length
+                break
+        
+        self._emit(self._buffer[:len(self._buffer) - keep])
+        self._buffer = self._buffer[len(self._buffer) - keep:]
+    
+    def close(self):
+        """Flush held-back text; an unterminated command block is written as-is."""
+        if self._in_command:
+            self._emit(CMD_OPEN)
+        self._emit(self._buffer)
+        self._buffer = ""
+        self._in_command = False
+    
+    def reset(self):
+        """Drop held-back text and start over, e.g. when a partially streamed response is abandoned."""
+        # Text already written can't be taken back; end its line so what follows starts cleanly
+        if self._wrote:
+            self._write("\n")
+        self._buffer = ""
+        self._in_command = False
+        self._wrote = False
+        self.fed = False
+
+def _print_redacted(s, out):
+    """Write a complete response to out, replacing each <command>...</command> block with a placeholder."""
+    prev = 0
+    while True:
+        i = s.find(CMD_OPEN, prev)
+        if i < 0:
+            break
+        j = s.find(CMD_CLOSE, i + len(CMD_OPEN))
+        if j < 0:
+            # Unterminated blocks are written as-is
+            break
+        out(s[prev:i])
+        out(CMD_PLACEHOLDER)
+        prev = j + len(CMD_CLOSE)
+    out(s[prev:])
+
+def _write_block(parts):
+    """Write several pieces of output with a single write and flush."""
+    sys.stdout.write("".join(parts))
+    sys.stdout.flush()
+
+def _write_now(text):
+    """Write text to stdout immediately."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+def _write_worker():
+    """Apply queued context writes in the order they were submitted."""
+    while True:
+        fn, fn_args = _write_q.get()
+        try:
+            fn(*fn_args)
+        except Exception as e:
+            print(f"Error saving to context: {str(e)}")
+        finally:
+            _write_q.task_done()
+
+def _flush_writes():
+    """Wait until every queued context write has been applied."""
+    _write_q.join()
+
+def _history_cap(history_limit):
+    """Messages kept by --history-limit, or None when it is negative (no limit, as with SQLite's LIMIT)."""
+    return history_limit if history_limit >= 0 else None
 
 def handle_special_command(command, context, session_id, args):
     """Handle special commands like help, exit, etc."""
+    _flush_writes()
     command = command.strip().lower()
     
     if command in ('exit', 'quit'):
@@ -189,7 +386,12 @@ def handle_special_command(command, context, session_id, args):
         return True
     
     elif command == 'clear':
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if os.name == 'nt':
+            os.system('cls')
+        else:
+            # Clear screen and move the cursor home without spawning a shell
+            sys.stdout.write("\x1b[2J\x1b[H")
+            sys.stdout.flush()
         return True
     
     elif command == 'sessions':
@@ -198,9 +400,7 @@ def handle_special_command(command, context, session_id, args):
     
     elif command.startswith('switch '):
         new_session_id = command.split(' ', 1)[1].strip()
-        sessions = context.get_sessions_list()
-        session_ids = [s['session_id'] for s in sessions]
-        if new_session_id in session_ids:
+        if context.session_exists(new_session_id):
             return False, new_session_id
         else:
             print(f"Session {new_session_id} not found.")
@@ -213,12 +413,16 @@ def handle_special_command(command, context, session_id, args):
         return True
     
     elif command == 'context':
-        ctx = context.get_openai_context(session_id, args.history_limit)
+        summary = context.get_session_summary(session_id)
+        message_count = summary['message_count']
+        history_cap = _history_cap(args.history_limit)
+        if history_cap is not None:
+            message_count = min(message_count, history_cap)
         print("\nCurrent Context Summary:")
-        print(f"Session: {ctx['session']['name']} ({ctx['session']['session_id']})")
-        print(f"Started: {ctx['session']['start_time']}")
-        print(f"Last Updated: {ctx['session']['last_updated']}")
-        print(f"Messages in Context: {len(ctx['messages'])}")
+        print(f"Session: {summary['name']} ({summary['session_id']})")
+        print(f"Started: {summary['start_time']}")
+        print(f"Last Updated: {summary['last_updated']}")
+        print(f"Messages in Context: {message_count}")
         return True
     
     elif command == 'reset':
@@ -227,13 +431,30 @@ def handle_special_command(command, context, session_id, args):
     elif command.startswith('export '):
         filename = command.split(' ', 1)[1].strip()
         ctx = context.get_openai_context(session_id)
-        with open(filename, 'w') as f:
-            json.dump(ctx, f, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(_json_dumps(ctx))
         print(f"Exported session to {filename}")
         return True
     
     return False
 
+def _load_recent_messages(context, session_id, history_limit):
+    """
+    Fetch a session and its recent messages to seed the in-memory history.
+    
+    Args:
+        context: ConversationContext instance
+        session_id: Session ID to load
+        history_limit: Maximum number of messages to keep
+        
+    Returns:
+        tuple: (session dictionary, deque of messages newest first)
+    """
+    _flush_writes()
+    session = context.get_session(session_id)
+    messages = context.get_session_messages(session_id, history_limit)
+    return session, collections.deque(messages, maxlen=_history_cap(history_limit))
+
 def run_assistant_loop(args, context, session_id):
     """
     Run the assistant loop with improved interactivity.
@@ -246,12 +467,14 @@ def run_assistant_loop(args, context, session_id):
     call_number = 1
     completed_calls = 0
     prompt = args.prompt
+    session, recent_messages = _load_recent_messages(context, session_id, args.history_limit)
     
-    while completed_calls < args.max_calls:
-        if not prompt:
-            if args.interactive:
-                try:
-                    prompt = input("\n\033[1;36m> \033[0m").strip()
+    # A single guard covers input(), the unsafe-command prompt, and in-flight requests
+    try:
+        while completed_calls < args.max_calls:
+            if not prompt:
+                if args.interactive:
+                    prompt = input(C_PROMPT).strip()
                     
                     # Handle special commands
                     if prompt:
@@ -265,10 +488,11 @@ def run_assistant_loop(args, context, session_id):
                                 print("Resetting context for this session...")
                                 # Clear all messages but keep session
                                 session_id = context.create_session(
-                                    get_system_info(),
+                                    args.system_info or get_system_info(),
                                     args.base_prompt,
                                     args.session_name or f"Session {session_id}"
                                 )
+                                session, recent_messages = _load_recent_messages(context, session_id, args.history_limit)
                                 call_number = 1
                                 prompt = None
                                 continue
@@ -276,113 +500,285 @@ def run_assistant_loop(args, context, session_id):
                                 # Switch to a different session
                                 session_id = result[1]
                                 print(f"Switched to session: {session_id}")
-                                call_number = len(context.get_session_messages(session_id)) + 1
+                                session, recent_messages = _load_recent_messages(context, session_id, args.history_limit)
+                                call_number = context.get_message_count(session_id) + 1
                                 prompt = None
                                 continue
-                except KeyboardInterrupt:
-                    print("\nInterrupted by user.")
+                else:
+                    print("No prompt provided. Exiting.")
                     break
-                except EOFError:
-                    print("\nEnd of input. Exiting.")
-                    break
-            else:
-                print("No prompt provided. Exiting.")
-                break
-        
-        # Print call information
-        print(f"\n\033[1;32m=== CALL #{call_number} ({completed_calls + 1}/{args.max_calls}) ===\033[0m")
-        if args.verbose:
-            print(f"\033[0;37mPrompt: {prompt}\033[0m")
-        
-        # Add user message to context
-        context.add_message(session_id, "user", prompt, call_number)
-        
-        # Get context for API request
-        api_context = context.get_openai_context(session_id, args.history_limit)
-        
-        # Make API request
-        response_text = make_openai_request(
-            api_context["messages"],
-            temperature=args.temperature
-        )
-        
-        # Extract commands
-        commands = extract_commands(response_text)
-        
-        # Add assistant message to context
-        message_id = context.add_message(session_id, "assistant", response_text, call_number)
-        
-        # Print the response (excluding command blocks which we'll execute separately)
-        response_without_commands = re.sub(r'<command>.*?</command>', 
-                                         '<command>...</command>', 
-                                         response_text, 
-                                         flags=re.DOTALL)
-        print("\n\033[1;34mAssistant:\033[0m")
-        print(response_without_commands)
-        
-        # Execute commands if any
-        if commands:
-            print("\n\033[1;33mExecuting Commands:\033[0m")
             
-            # Check for potentially dangerous commands
-            filtered_commands, skipped_lines = filter_commands(commands)
+            # Build the request from the locally kept history; the new prompt is only
+            # written once the response arrives
+            api_messages = context.build_openai_messages(session, recent_messages)
+            api_messages.append({"role": "user", "content": prompt})
             
-            if skipped_lines:
-                print("\n\033[1;31mWARNING: Skipped potentially unsafe commands:\033[0m")
-                for line_num, cmd in skipped_lines:
-                    print(f"  Line {line_num}: {cmd}")
-                
-                if args.interactive:
-                    proceed = input("\nSome commands were flagged as potentially unsafe. Proceed? (y/n): ")
-                    if proceed.lower() != 'y':
-                        print("Execution aborted by user.")
-                        output = "Execution aborted by user due to potentially unsafe commands."
-                        context.add_command(session_id, message_id, commands, output, 1, 0.0)
-                        break
+            # Print call information and the assistant header in one write
+            out_buf = [f"{C_CALL}{call_number} ({completed_calls + 1}/{args.max_calls}) ==={C_RESET}\n"]
+            if args.verbose:
+                out_buf.append(f"{C_DIM}Prompt: {prompt}{C_RESET}\n")
+            out_buf.append(C_ASSIST)
+            _write_block(out_buf)
             
-            # Execute the commands
-            start_time = time.time()
-            output = execute_commands(filtered_commands)
-            execution_time = time.time() - start_time
+            # Make API request, printing the response as it streams in
+            # (excluding command blocks which we'll execute separately)
+            redactor = CommandRedactor(_write_now)
+            response_text = make_openai_request(
+                api_messages,
+                temperature=args.temperature,
+                on_delta=redactor.feed,
+                on_discard=redactor.reset
+            )
             
-            # Determine exit code (approximate from output)
-            exit_code = 0 if "ERROR:" not in output else 1
+            # Error messages are returned rather than streamed
+            if not redactor.fed:
+                redactor.feed(response_text)
+            redactor.close()
+            print()
             
-            # Add command to context
-            context.add_command(session_id, message_id, commands, output, exit_code, execution_time)
-        
-        # Increment call number and completed calls counter
-        call_number += 1
-        completed_calls += 1
-        
-        # Check if we've reached the maximum number of calls
-        if completed_calls >= args.max_calls:
-            print(f"\n\033[1;32mReached maximum number of calls ({args.max_calls}). Exiting.\033[0m")
-            break
+            # Store the turn and run its commands; stop if the user declines flagged commands
+            if not store_turn(context, session_id, call_number, prompt, response_text,
+                              confirm_unsafe=args.interactive, recent_messages=recent_messages):
+                break
+            
+            # Increment call number and completed calls counter
+            call_number += 1
+            completed_calls += 1
+            
+            # Check if we've reached the maximum number of calls
+            if completed_calls >= args.max_calls:
+                sys.stdout.write(f"{C_SUCCESS}Reached maximum number of calls ({args.max_calls}). Exiting.{C_RESET}\n")
+                break
+            
+            # Determine next prompt
+            if args.auto_loop:
+                # In auto-loop mode, keep using the same prompt
+                time.sleep(args.loop_delay)
+                print(f"\nAuto-looping with delay of {args.loop_delay} seconds...")
+                # prompt remains the same
+            elif args.interactive:
+                # Interactive mode - we'll get the next prompt at the top of the loop
+                prompt = None
+            else:
+                # If not interactive or auto-loop, we're done after one call
+                break
+    except KeyboardInterrupt:
+        print("\nInterrupted by user.")
+    except EOFError:
+        print("\nEnd of input. Exiting.")
+    
+    _write_block([C_COMPLETE, f"Session ID: {session_id}\n"])
+    return session_id
+
+def store_turn(context, session_id, call_number, prompt, response_text, confirm_unsafe=False,
+               recent_messages=None):
+    """
+    Store a completed turn and run the commands in its response.
+    
+    Args:
+        context: ConversationContext instance
+        session_id: Current session ID
+        call_number: Call number the turn belongs to
+        prompt: Prompt that produced the response
+        response_text: The response text
+        confirm_unsafe: Ask before running when some commands were flagged as unsafe
+        recent_messages: In-memory history (newest first) to mirror the turn into, if any
         
-        # Determine next prompt
-        if args.auto_loop:
-            # In auto-loop mode, keep using the same prompt
-            time.sleep(args.loop_delay)
-            print(f"\nAuto-looping with delay of {args.loop_delay} seconds...")
-            # prompt remains the same
-        elif args.interactive:
-            # Interactive mode - we'll get the next prompt at the top of the loop
-            prompt = None
-        else:
-            # If not interactive or auto-loop, we're done after one call
-            break
+    Returns:
+        bool: False if the user declined to run flagged commands, True otherwise
+    """
+    # Extract commands
+    commands = extract_commands(response_text)
+    
+    # Add user and assistant messages to context in one transaction
+    _, message_id = context.add_messages([
+        (session_id, "user", prompt, call_number),
+        (session_id, "assistant", response_text, call_number),
+    ])
+    
+    # Mirror the new messages locally, newest first like get_session_messages
+    assistant_message = {"role": "assistant", "content": response_text, "call_number": call_number,
+                         "commands": []}
+    if recent_messages is not None:
+        recent_messages.appendleft({"role": "user", "content": prompt, "call_number": call_number,
+                                    "commands": []})
+        recent_messages.appendleft(assistant_message)
+    
+    def record_command(output, exit_code, execution_time):
+        # Add command to context in the background
+        _write_q.put((context.add_command, (session_id, message_id, commands, output, exit_code, execution_time)))
+        assistant_message["commands"].append({"command_text": commands, "output": output,
+                                              "exit_code": exit_code, "execution_time": execution_time})
+    
+    # Execute commands if any
+    if not commands:
+        return True
+    
+    # Check for potentially dangerous commands
+    filtered_commands, skipped_lines = filter_commands(commands)
+    
+    out_buf = [C_EXEC]
+    if skipped_lines:
+        out_buf.append(C_UNSAFE)
+        out_buf.extend(f"  Line {line_num}: {cmd}\n" for line_num, cmd in skipped_lines)
+    _write_block(out_buf)
+    
+    if skipped_lines and confirm_unsafe:
+        proceed = input("\nSome commands were flagged as potentially unsafe. Proceed? (y/n): ")
+        if proceed.lower() != 'y':
+            print("Execution aborted by user.")
+            record_command("Execution aborted by user due to potentially unsafe commands.", 1, 0.0)
+            return False
+    
+    # Execute the commands
+    start_time = time.monotonic()
+    output, exit_code = execute_commands(filtered_commands)
+    record_command(output, exit_code, time.monotonic() - start_time)
+    return True
+
+def record_response(context, session_id, call_number, prompt, response_text):
+    """
+    Print a complete response, store it, and run its commands without asking for confirmation.
+    
+    Args:
+        context: ConversationContext instance
+        session_id: Current session ID
+        call_number: Call number the response belongs to
+        prompt: Prompt that produced the response
+        response_text: The response text
+    """
+    # Print the response (excluding command blocks which we'll execute separately)
+    # The body goes straight to stdout so no redacted copy of it is built
+    _write_block([C_ASSIST])
+    _print_redacted(response_text, sys.stdout.write)
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+    
+    store_turn(context, session_id, call_number, prompt, response_text)
+
+def run_parallel_auto_loop(args, context, session_id):
+    """
+    Run auto-loop calls concurrently instead of one after another.
+    
+    Every call is sent the context as it stood before the first request. Responses
+    are recorded and their commands executed one at a time, in completion order.
     
-    print("\n\033[1;32mSession complete.\033[0m")
-    print(f"Session ID: {session_id}")
+    Args:
+        args: Command-line arguments
+        context: ConversationContext instance
+        session_id: Current session ID
+    """
+    if not args.prompt:
+        print("No prompt provided. Exiting.")
+    else:
+        try:
+            asyncio.run(_run_parallel_auto_loop(args, context, session_id))
+        except KeyboardInterrupt:
+            print("\nInterrupted by user.")
+    
+    _write_block([C_COMPLETE, f"Session ID: {session_id}\n"])
+    return session_id
+
+async def _run_parallel_auto_loop(args, context, session_id):
+    """Issue the auto-loop calls from a pool of workers bounded by --concurrency and --rpm."""
+    loop = asyncio.get_running_loop()
+    api_context = context.get_openai_context(session_id, args.history_limit)
+    api_context["messages"].append({"role": "user", "content": args.prompt})
+    
+    pending = asyncio.Queue()
+    for call_number in range(1, args.max_calls + 1):
+        pending.put_nowait(call_number)
+    
+    # Requests are spaced 60/rpm seconds apart; responses are handled one at a time
+    interval = 60 / args.rpm if args.rpm > 0 else 0
+    next_submit = loop.time()
+    submit_lock = asyncio.Lock()
+    record_lock = asyncio.Lock()
+    completed_calls = 0
+    
+    async def worker():
+        nonlocal next_submit, completed_calls
+        while True:
+            try:
+                call_number = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            
+            if interval:
+                async with submit_lock:
+                    delay = next_submit - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    next_submit = max(next_submit, loop.time()) + interval
+            
+            response_text = await make_openai_request_async(
+                api_context["messages"],
+                temperature=args.temperature
+            )
+            
+            async with record_lock:
+                completed_calls += 1
+                out_buf = [f"{C_CALL}{call_number} ({completed_calls}/{args.max_calls}) ==={C_RESET}\n"]
+                if args.verbose:
+                    out_buf.append(f"{C_DIM}Prompt: {args.prompt}{C_RESET}\n")
+                _write_block(out_buf)
+                # Commands run in a worker thread so the other requests keep streaming in
+                await asyncio.to_thread(
+                    record_response, context, session_id, call_number, args.prompt, response_text
+                )
+    
+    await asyncio.gather(*(worker() for _ in range(min(args.max_calls, args.concurrency))))
+
+def run_batch_loop(args, context, session_id):
+    """
+    Send all calls as a single OpenAI batch and record the results once it completes.
+    
+    Args:
+        args: Command-line arguments
+        context: ConversationContext instance
+        session_id: Current session ID
+    """
+    if not args.prompt:
+        print("No prompt provided. Exiting.")
+    else:
+        api_context = context.get_openai_context(session_id, args.history_limit)
+        api_context["messages"].append({"role": "user", "content": args.prompt})
+        
+        # The calls are independent: each is sent the context as it stood before the batch,
+        # and none of them sees another call's response or command output
+        total_calls = args.max_calls if args.auto_loop else 1
+        batch_ids = []
+        responses = None
+        try:
+            responses = submit_batch([api_context["messages"]] * total_calls, temperature=args.temperature,
+                                     on_submit=batch_ids.append)
+            
+            for call_number, response_text in enumerate(responses, 1):
+                out_buf = [f"{C_CALL}{call_number}/{total_calls} ==={C_RESET}\n"]
+                if args.verbose:
+                    out_buf.append(f"{C_DIM}Prompt: {args.prompt}{C_RESET}\n")
+                _write_block(out_buf)
+                record_response(context, session_id, call_number, args.prompt, response_text)
+        except KeyboardInterrupt:
+            print("\nInterrupted by user.")
+            if responses is None and batch_ids:
+                # Stopping the poll doesn't cancel the job on OpenAI's side
+                print(f"Batch {batch_ids[0]} is still running; its results were not recorded.")
+    
+    _write_block([C_COMPLETE, f"Session ID: {session_id}\n"])
     return session_id
 
 def main():
     """Main entry point for the application."""
     args = get_args()
     
+    # Line editing and history are only needed for the interactive prompt
+    if args.interactive:
+        import readline  # Enables command history and editing
+    
     # Initialize context handler
     context = ConversationContext()
+    threading.Thread(target=_write_worker, daemon=True).start()
     
     # Handle listing sessions
     if args.list_sessions:
@@ -391,14 +787,11 @@ def main():
     
     # Handle exporting a session
     if args.export_session:
-        sessions = context.get_sessions_list()
-        session_ids = [s['session_id'] for s in sessions]
-        
-        if args.export_session in session_ids:
+        if context.session_exists(args.export_session):
             ctx = context.get_openai_context(args.export_session)
             export_file = f"session_{args.export_session}.json"
-            with open(export_file, 'w') as f:
-                json.dump(ctx, f, indent=2)
+            with open(export_file, 'wb') as f:
+                f.write(_json_dumps(ctx))
             print(f"Exported session to {export_file}")
         else:
             print(f"Session {args.export_session} not found.")
@@ -408,10 +801,7 @@ def main():
     # Get or create session ID
     session_id = None
     if args.session:
-        sessions = context.get_sessions_list()
-        session_ids = [s['session_id'] for s in sessions]
-        
-        if args.session in session_ids:
+        if context.session_exists(args.session):
             session_id = args.session
             print(f"Continuing session: {session_id}")
         else:
@@ -431,9 +821,15 @@ def main():
     if args.interactive:
         print_banner()
     
-    # Run the assistant loop
-    session_id = run_assistant_loop(args, context, session_id)
+    # Run the assistant loop; independent auto-loop calls can be batched or issued concurrently
+    if args.batch and not args.interactive:
+        session_id = run_batch_loop(args, context, session_id)
+    elif args.auto_loop and args.concurrency > 1 and not args.interactive:
+        session_id = run_parallel_auto_loop(args, context, session_id)
+    else:
+        session_id = run_assistant_loop(args, context, session_id)
     
+    _flush_writes()
     print(f"\nSession {session_id} completed.")
     
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 """
 Improved OpenAI API handler for the Assistant Project.
 """
+import asyncio
 import os
 import openai
 from typing import List, Dict, Any, Optional
@@ -22,9 +23,60 @@ print(f"Model: {DEFAULT_MODEL}")
 if OPENAI_API_KEY:
     openai.api_key = OPENAI_API_KEY
 
-def make_openai_request(messages, model=None, temperature=0.7, max_tokens=2048, timeout=60, retry_attempts=3):
+# Asynchronous client for concurrent requests, created on first use
+_async_client = None
+
+def _completion_params(messages, model, temperature, max_tokens):
+    """Build the chat completion parameters shared by every request path."""
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "top_p": 1.0,
+        "frequency_penalty": 0.0,
+        "presence_penalty": 0.0,
+    }
+
+def _retry_decision(error, attempt, retry_attempts):
+    """
+    Decide whether a failed request attempt should be retried.
+    
+    Args:
+        error (Exception): The error raised by the attempt
+        attempt (int): Zero-based number of the failed attempt
+        retry_attempts (int): Total number of attempts allowed
+        
+    Returns:
+        tuple: (wait_time, None) to retry after wait_time seconds, or (None, error_message) to give up
+    """
+    if isinstance(error, openai.BadRequestError):
+        # For bad requests, we don't retry as they're likely to fail again
+        return None, f"Bad request to OpenAI API: {str(error)}"
+    
+    if isinstance(error, openai.APIConnectionError):
+        wait_time = 2 ** attempt  # Exponential backoff
+        retry_message = "API connection error"
+        final_message = f"Error connecting to OpenAI API after {retry_attempts} attempts: {str(error)}"
+    elif isinstance(error, openai.RateLimitError):
+        wait_time = 10 + 5 * attempt  # Longer wait for rate limits
+        retry_message = "Rate limit exceeded"
+        final_message = f"OpenAI API rate limit exceeded after {retry_attempts} attempts: {str(error)}"
+    else:
+        wait_time = 2 ** attempt
+        retry_message = "Error with OpenAI API"
+        final_message = f"Error with OpenAI API after {retry_attempts} attempts: {str(error)}"
+    
+    if attempt >= retry_attempts - 1:
+        return None, final_message
+    
+    print(f"{retry_message}, retrying in {wait_time} seconds... ({attempt+1}/{retry_attempts})")
+    return wait_time, None
+
+def make_openai_request(messages, model=None, temperature=0.7, max_tokens=2048, timeout=60, retry_attempts=3,
+                        on_delta=None, on_discard=None):
     """
-    Make a request to the OpenAI API with enhanced error handling and retry logic.
+    Make a streaming request to the OpenAI API with enhanced error handling and retry logic.
     
     Args:
         messages (List[Dict[str, str]]): Messages for the API
@@ -33,6 +85,9 @@ def make_openai_request(messages, model=None, temperature=0.7, max_tokens=2048,
         max_tokens (int, optional): Maximum tokens in the response
         timeout (int, optional): Timeout in seconds
         retry_attempts (int, optional): Number of retry attempts
+        on_delta (Callable[[str], None], optional): Called with each piece of response text as it arrives
+        on_discard (Callable[[], None], optional): Called when text already passed to on_delta is abandoned
+            because the stream failed, before the request is retried or an error message is returned
         
     Returns:
         str: The response text
@@ -46,45 +101,158 @@ def make_openai_request(messages, model=None, temperature=0.7, max_tokens=2048,
     for attempt in range(retry_attempts):
         try:
             response = openai.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0,
+                **_completion_params(messages, model, temperature, max_tokens),
+                timeout=timeout,
+                stream=True
+            )
+            
+            # Collect the streamed deltas, forwarding each one as it arrives
+            parts = []
+            try:
+                for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        if on_delta:
+                            on_delta(delta)
+            except Exception:
+                # The partial response is thrown away; let the caller discard what it showed
+                if parts and on_discard:
+                    on_discard()
+                raise
+            
+            return "".join(parts)
+        
+        except Exception as e:
+            wait_time, error_message = _retry_decision(e, attempt, retry_attempts)
+            if error_message is not None:
+                return error_message
+            time.sleep(wait_time)
+
+def _get_async_client():
+    """Create the shared asynchronous OpenAI client on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = openai.AsyncOpenAI(api_key=openai.api_key)
+    return _async_client
+
+async def make_openai_request_async(messages, model=None, temperature=0.7, max_tokens=2048, timeout=60,
+                                    retry_attempts=3):
+    """
+    Make a request to the OpenAI API from a running event loop, with the same retry logic as make_openai_request.
+    
+    Args:
+        messages (List[Dict[str, str]]): Messages for the API
+        model (str, optional): The model to use
+        temperature (float, optional): Temperature for sampling
+        max_tokens (int, optional): Maximum tokens in the response
+        timeout (int, optional): Timeout in seconds
+        retry_attempts (int, optional): Number of retry attempts
+        
+    Returns:
+        str: The response text
+    """
+    if not openai.api_key:
+        raise ValueError("OpenAI API key not set. Please set the OPENAI_API_KEY environment variable.")
+    
+    model = model or DEFAULT_MODEL
+    client = _get_async_client()
+    
+    # Retry loop
+    for attempt in range(retry_attempts):
+        try:
+            response = await client.chat.completions.create(
+                **_completion_params(messages, model, temperature, max_tokens),
                 timeout=timeout
             )
             
             return response.choices[0].message.content
         
-        except openai.APIConnectionError as e:
-            if attempt < retry_attempts - 1:
-                wait_time = 2 ** attempt  # Exponential backoff
-                print(f"API connection error, retrying in {wait_time} seconds... ({attempt+1}/{retry_attempts})")
-                time.sleep(wait_time)
-            else:
-                return f"Error connecting to OpenAI API after {retry_attempts} attempts: {str(e)}"
+        except Exception as e:
+            wait_time, error_message = _retry_decision(e, attempt, retry_attempts)
+            if error_message is not None:
+                return error_message
+            await asyncio.sleep(wait_time)
+
+def submit_batch(messages_list, model=None, temperature=0.7, max_tokens=2048, poll_interval=5,
+                 max_poll_interval=60, on_submit=None):
+    """
+    Run a list of chat requests through the OpenAI Batch API and wait for the results.
+    
+    Args:
+        messages_list (List[List[Dict[str, str]]]): Messages for each request
+        model (str, optional): The model to use
+        temperature (float, optional): Temperature for sampling
+        max_tokens (int, optional): Maximum tokens in each response
+        poll_interval (int, optional): Initial delay between status checks in seconds
+        max_poll_interval (int, optional): Upper bound for the delay between status checks
+        on_submit (Callable[[str], None], optional): Called with the batch ID once the batch is created
+        
+    Returns:
+        List[str]: The response texts, in the same order as messages_list
+    """
+    if not openai.api_key:
+        raise ValueError("OpenAI API key not set. Please set the OPENAI_API_KEY environment variable.")
+    
+    model = model or DEFAULT_MODEL
+    
+    # One JSONL line per request; custom_id maps each result back to its position
+    lines = []
+    for i, messages in enumerate(messages_list):
+        lines.append(json.dumps({
+            "custom_id": f"call-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": _completion_params(messages, model, temperature, max_tokens),
+        }))
+    
+    try:
+        batch_file = openai.files.create(
+            file=("batch_input.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = openai.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"Submitted batch {batch.id} with {len(lines)} requests")
+        if on_submit:
+            on_submit(batch.id)
         
-        except openai.RateLimitError as e:
-            if attempt < retry_attempts - 1:
-                wait_time = 10 + 5 * attempt  # Longer wait for rate limits
-                print(f"Rate limit exceeded, retrying in {wait_time} seconds... ({attempt+1}/{retry_attempts})")
-                time.sleep(wait_time)
-            else:
-                return f"OpenAI API rate limit exceeded after {retry_attempts} attempts: {str(e)}"
+        # Poll with exponential backoff until the batch reaches a final state
+        wait_time = poll_interval
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(wait_time)
+            wait_time = min(wait_time * 2, max_poll_interval)
+            batch = openai.batches.retrieve(batch.id)
+            print(f"Batch {batch.id}: {batch.status}")
         
-        except openai.BadRequestError as e:
-            # For bad requests, we don't retry as they're likely to fail again
-            return f"Bad request to OpenAI API: {str(e)}"
+        if not batch.output_file_id:
+            error = f"Batch {batch.id} finished with status '{batch.status}' and no output"
+            return [error] * len(lines)
         
-        except Exception as e:
-            if attempt < retry_attempts - 1:
-                wait_time = 2 ** attempt
-                print(f"Error with OpenAI API, retrying in {wait_time} seconds... ({attempt+1}/{retry_attempts})")
-                time.sleep(wait_time)
-            else:
-                return f"Error with OpenAI API after {retry_attempts} attempts: {str(e)}"
+        output = openai.files.content(batch.output_file_id).text
+    except Exception as e:
+        error = f"Error with OpenAI Batch API: {str(e)}"
+        return [error] * len(lines)
+    
+    # Results come back in arbitrary order; place each one by its custom_id
+    results = [f"No result returned for call-{i}" for i in range(len(lines))]
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        index = int(item["custom_id"].split("-", 1)[1])
+        response = item.get("response") or {}
+        if response.get("status_code") == 200:
+            results[index] = response["body"]["choices"][0]["message"]["content"]
+        else:
+            results[index] = f"Error with OpenAI API: {item.get('error') or response.get('body')}"
+    
+    return results
 
 def format_message_with_system_info(system_info, base_prompt, conversation_history):
     """